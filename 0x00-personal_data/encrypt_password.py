@@ -1,13 +1,78 @@
 #!/usr/bin/env python3
 """Module containing password hashing methods"""
+import asyncio
+import atexit
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, List, Tuple
 import bcrypt
 
 
-def hash_password(password: str) -> bytes:
+MIN_ROUNDS = 12
+MAX_ROUNDS = 16
+_pool = None
+_rounds = None
+
+
+def calibrate_rounds(budget_ms: float, min_rounds: int = MIN_ROUNDS,
+                     max_rounds: int = MAX_ROUNDS) -> int:
+    """Function returning the highest bcrypt cost that fits budget_ms
+
+    The host is timed at min_rounds (best of two runs); each extra round
+    doubles the work, so the cost is raised while the projected time
+    stays within the budget. min_rounds (the bcrypt default cost) is a
+    floor: the budget can only raise the cost, even on slow hosts.
+    """
+
+    elapsed = None
+    for _ in range(2):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(min_rounds))
+        sample = (time.perf_counter() - start) * 1000
+        elapsed = sample if elapsed is None else min(elapsed, sample)
+
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed * 2 <= budget_ms:
+        elapsed *= 2
+        rounds += 1
+    return rounds
+
+
+def get_rounds() -> int:
+    """Function returning the bcrypt cost calibrated for this host
+
+    The latency budget is read from BCRYPT_LATENCY_BUDGET_MS (250 ms by
+    default) and the benchmark only runs on the first call.
+    """
+
+    global _rounds
+    if _rounds is None:
+        budget = float(os.getenv("BCRYPT_LATENCY_BUDGET_MS", "250"))
+        _rounds = calibrate_rounds(budget)
+    return _rounds
+
+
+def hashed_rounds(hashed_password: bytes) -> int:
+    """Function returning the cost a bcrypt hash was computed with"""
+
+    return int(hashed_password.split(b"$")[2])
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    """Function telling if a hash uses a cost below the calibrated one"""
+
+    return hashed_rounds(hashed_password) < get_rounds()
+
+
+def hash_password(password: str, rounds: int = None) -> bytes:
     """Function returns salted and hashed password taken in string format"""
 
+    if rounds is None:
+        rounds = get_rounds()
     encrypted = password.encode()
-    hashed_password = bcrypt.hashpw(encrypted, bcrypt.gensalt())
+    hashed_password = bcrypt.hashpw(encrypted, bcrypt.gensalt(rounds))
     return hashed_password
 
 
@@ -21,3 +86,57 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
         status = True
 
     return status
+
+
+def _is_valid_pair(pair: Tuple[bytes, str]) -> bool:
+    """Function unpacking a (hashed_password, password) pair for the pool"""
+
+    return is_valid(*pair)
+
+
+def _shutdown_pool():
+    """Function that stops the worker processes of the hashing pool"""
+
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Function that returns the process pool sized to the cores"""
+
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        atexit.register(_shutdown_pool)
+    return _pool
+
+
+def hash_passwords(passwords: Iterable[str]) -> List[bytes]:
+    """Function hashing many passwords in parallel, keeping input order"""
+
+    hasher = partial(hash_password, rounds=get_rounds())
+    return list(get_pool().map(hasher, passwords))
+
+
+def verify_many(pairs: Iterable[Tuple[bytes, str]]) -> List[bool]:
+    """Function checking many (hashed_password, password) pairs in parallel"""
+
+    return list(get_pool().map(_is_valid_pair, pairs))
+
+
+async def hash_password_async(password: str) -> bytes:
+    """Coroutine hashing a password in the pool without blocking the loop"""
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), hash_password, password,
+                                      get_rounds())
+
+
+async def is_valid_async(hashed_password: bytes, password: str) -> bool:
+    """Coroutine checking a password in the pool without blocking the loop"""
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), is_valid,
+                                      hashed_password, password)
@@ -1,20 +1,63 @@
 #!/usr/bin/env python3
 """Module containing functions to obfuscate log messages"""
+import atexit
+import queue
 import re
-from typing import List
+import sys
+import time
+from functools import lru_cache
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
+from typing import List, Sequence, Tuple
 import logging
 import os
 import mysql.connector
 
 
+class Redactor:
+    """Single-pass redaction engine compiled for a fields/separator pair"""
+
+    def __init__(self, fields: Sequence[str], separator: str):
+        """Function to compile one alternation pattern for all the fields"""
+
+        self.fields = tuple(fields)
+        self.separator = separator
+        self.pattern = None
+        if self.fields:
+            alternation = '|'.join(re.escape(f) for f in self.fields)
+            self.pattern = re.compile(
+                f'({alternation})=.*?{re.escape(separator)}')
+
+    def redact(self, redaction: str, message: str) -> str:
+        """Function that obfuscates every field of message in one scan"""
+
+        if self.pattern is None:
+            return message
+        tail = f'={redaction}{self.separator}'.replace('\\', '\\\\')
+        return self.pattern.sub(r'\g<1>' + tail, message)
+
+    def redact_many(self, redaction: str, messages: List[str]) -> List[str]:
+        """Function that obfuscates a batch of single-line messages at once"""
+
+        if not messages:
+            return []
+        joined = '\n'.join(messages)
+        if joined.count('\n') != len(messages) - 1:
+            return [self.redact(redaction, m) for m in messages]
+        return self.redact(redaction, joined).split('\n')
+
+
+@lru_cache(maxsize=128)
+def get_redactor(fields: Sequence[str], separator: str) -> Redactor:
+    """Function that returns the cached Redactor of a fields tuple"""
+
+    return Redactor(fields, separator)
+
+
 def filter_datum(fields: List[str], redaction: str, message: str,
                  separator: str) -> str:
     """Function that returns the log message obfuscated"""
 
-    for i in fields:
-        message = re.sub(f'{i}=.*?{separator}', f'{i}={redaction}{separator}',
-                         message)
-    return message
+    return get_redactor(tuple(fields), separator).redact(redaction, message)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -29,27 +72,126 @@ class RedactingFormatter(logging.Formatter):
 
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self.redactor = get_redactor(tuple(fields), self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
         """Function to filter values in incoming log records"""
 
-        record.msg = filter_datum(self.fields, self.REDACTION,
-                                  record.getMessage(), self.SEPARATOR)
+        record.msg = self.redactor.redact(self.REDACTION, record.getMessage())
         return super(RedactingFormatter, self).format(record)
 
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
 
 
-def get_logger() -> logging.Logger:
-    """Function that reurns a logging object of user data"""
+class BoundedQueueHandler(QueueHandler):
+    """Queue handler applying a drop or backpressure policy when full
+
+    With the "drop" policy a record that does not fit in the queue is
+    discarded and counted in `dropped`; with "block" the caller waits at
+    most `timeout` seconds for room before dropping it.
+    """
+
+    def __init__(self, log_queue: queue.Queue, policy: str = "drop",
+                 timeout: float = 0.1):
+        """Function to initialise the handler and its overflow policy"""
+
+        super(BoundedQueueHandler, self).__init__(log_queue)
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown queue policy {policy}")
+        self.policy = policy
+        self.timeout = timeout
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Function that merges args only, formatting is left to listener
+
+        The traceback is rendered into exc_text first, since exc_info
+        cannot cross the queue, so the listener still emits it.
+        """
+
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        """Function to put a record on the queue following the policy"""
+
+        try:
+            if self.policy == "block":
+                self.queue.put(record, timeout=self.timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BlockingSentinelListener(QueueListener):
+    """Queue listener that waits for room to enqueue its stop sentinel"""
+
+    def enqueue_sentinel(self):
+        """Function to enqueue the sentinel even when the queue is full"""
+
+        self.queue.put(self._sentinel)
+
+
+_listener = None
+
+
+def _stop_listener():
+    """Function that drains and stops the background log listener"""
+
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
+
+def get_logger(asynchronous: bool = False, queue_size: int = 10000,
+               policy: str = "drop") -> logging.Logger:
+    """Function that reurns a logging object of user data
+
+    With asynchronous=True records go through a bounded queue and are
+    redacted and written by a background QueueListener. Calling it again
+    returns the already configured logger when its setup matches the
+    arguments; otherwise the queue is drained and the handlers are
+    rebuilt for the requested mode.
+    """
+
+    global _listener
     logger = logging.getLogger("user_data")
+    if logger.handlers:
+        queue_handler = next((h for h in logger.handlers
+                              if isinstance(h, BoundedQueueHandler)), None)
+        if queue_handler is None and not asynchronous:
+            return logger
+        if queue_handler is not None and asynchronous and \
+                queue_handler.queue.maxsize == queue_size and \
+                queue_handler.policy == policy:
+            return logger
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        _stop_listener()
+
     logger.setLevel(logging.INFO)
     logger.propagate = False
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
-    logger.addHandler(stream_handler)
+
+    if not asynchronous:
+        logger.addHandler(stream_handler)
+        return logger
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    _listener = BlockingSentinelListener(log_queue, stream_handler,
+                                         respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
+    logger.addHandler(BoundedQueueHandler(log_queue, policy))
 
     return logger
 
@@ -69,8 +211,89 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     return cnx
 
 
-def main():
-    """Function to obtain db connection and retrieve rows from users table"""
+def get_export_logger(batch_size: int) -> logging.Logger:
+    """Function that returns a buffered logger for pre-redacted rows
+
+    The logger is set up once; later calls resize its buffer to
+    batch_size, flushing the records it already holds.
+    """
+
+    logger = logging.getLogger("user_data.export")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(
+            logging.Formatter(RedactingFormatter.FORMAT))
+        logger.addHandler(MemoryHandler(batch_size, logging.ERROR,
+                                        stream_handler))
+    for handler in logger.handlers:
+        if isinstance(handler, MemoryHandler) and \
+                handler.capacity != batch_size:
+            handler.flush()
+            handler.capacity = batch_size
+    return logger
+
+
+def format_row(row: Sequence, field_names: List[str]) -> str:
+    """Function that renders a users row as a key=value; log line"""
+
+    return ' '.join(f'{f}={r};' for r, f in zip(row, field_names))
+
+
+def export_users(batch_size: int) -> Tuple[int, float]:
+    """Function that streams the users table through the redactor
+
+    Rows are fetched with an unbuffered (server-side) cursor in
+    fetchmany batches, each batch is redacted in one pass and written
+    through a MemoryHandler so memory stays flat whatever the table size.
+    Returns the number of exported rows and the rows per second.
+    """
+
+    db = get_db()
+    cursor = db.cursor(buffered=False)
+    cursor.execute("SELECT * FROM users;")
+    field_names = [i[0] for i in cursor.description]
+
+    logger = get_export_logger(batch_size)
+    redactor = get_redactor(PII_FIELDS, RedactingFormatter.SEPARATOR)
+    count = 0
+    start = time.perf_counter()
+
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            lines = [format_row(row, field_names) for row in rows]
+            for line in redactor.redact_many(RedactingFormatter.REDACTION,
+                                             lines):
+                logger.info(line)
+            count += len(rows)
+    finally:
+        for handler in logger.handlers:
+            handler.flush()
+        cursor.close()
+        db.close()
+
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    return count, rate
+
+
+def main(batch_size: int = None):
+    """Function to obtain db connection and retrieve rows from users table
+
+    When batch_size (or PERSONAL_DATA_EXPORT_BATCH) is set, rows are
+    exported in streaming mode through export_users.
+    """
+
+    if batch_size is None:
+        batch_size = int(os.getenv("PERSONAL_DATA_EXPORT_BATCH", "0") or 0)
+    if batch_size > 0:
+        count, rate = export_users(batch_size)
+        print(f"exported {count} rows ({rate:.0f} rows/s)", file=sys.stderr)
+        return
 
     db = get_db()
     cursor = db.cursor()
@@ -80,8 +303,7 @@ def main():
     logger = get_logger()
 
     for row in cursor:
-        str_row = ''.join(f'{f}={str(r)}; ' for r, f in zip(row, field_names))
-        logger.info(str_row.strip())
+        logger.info(format_row(row, field_names))
 
     cursor.close()
     db.close()
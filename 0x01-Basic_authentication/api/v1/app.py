@@ -28,6 +28,7 @@ def not_found(error) -> str:
 
 
 auth = None
+excluded_paths = None
 if getenv('AUTH_TYPE') == 'auth':
     from api.v1.auth.auth import Auth
     auth = Auth()
@@ -35,6 +36,14 @@ elif getenv('AUTH_TYPE') == 'basic_auth':
     from api.v1.auth.basic_auth import BasicAuth
     auth = BasicAuth()
 
+if auth is not None:
+    from api.v1.auth.auth import PathMatcher
+    excluded_paths = PathMatcher([
+        '/api/v1/status/',
+        '/api/v1/unauthorized/',
+        '/api/v1/forbidden/'
+    ])
+
 
 @app.before_request
 def before_request():
@@ -42,19 +51,14 @@ def before_request():
     if auth is None:
         return
 
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/'
-    ]
-
     if not auth.require_auth(request.path, excluded_paths):
         return
 
     if auth.authorization_header(request) is None:
         abort(401)
 
-    if auth.current_user(request) is None:
+    request.current_user = auth.request_user(request)
+    if request.current_user is None:
         abort(403)
 
 
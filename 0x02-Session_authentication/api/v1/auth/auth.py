@@ -1,13 +1,59 @@
 #!/usr/bin/env python3
 """Auth class for Basic Authentication"""
-from flask import request
-from typing import List, TypeVar
+import re
+import threading
+from collections import OrderedDict
+from flask import g, request
+from typing import Iterable, List, TypeVar, Union
+
+
+class PathMatcher:
+    """Excluded paths compiled once for require_auth
+
+    Exact entries go in a set, entries ending with '*' are merged in a
+    single prefix regex, and the answers for the most recent paths are
+    memoized.
+    """
+
+    def __init__(self, excluded_paths: Iterable[str], memo_size: int = 256):
+        """Compile the excluded paths"""
+        self.excluded_paths = list(excluded_paths)
+        self.exact = {p for p in self.excluded_paths if not p.endswith('*')}
+        prefixes = [re.escape(p[:-1]) for p in self.excluded_paths
+                    if p.endswith('*')]
+        self.prefix_re = re.compile('|'.join(prefixes)) if prefixes else None
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        """True when at least one path is excluded"""
+        return bool(self.excluded_paths)
+
+    def matches(self, path: str) -> bool:
+        """Check if a path (ending with a slash) is excluded"""
+        with self._lock:
+            excluded = self._memo.get(path)
+            if excluded is not None:
+                self._memo.move_to_end(path)
+                return excluded
+
+        excluded = path in self.exact or (
+            self.prefix_re is not None and
+            self.prefix_re.match(path) is not None)
+
+        with self._lock:
+            self._memo[path] = excluded
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return excluded
 
 
 class Auth:
     """Auth class to manage API authentication"""
 
-    def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
+    def require_auth(self, path: str,
+                     excluded_paths: Union[List[str], PathMatcher]) -> bool:
         """Check if authentication is required for a path"""
         if path is None or excluded_paths is None or not excluded_paths:
             return True
@@ -15,6 +61,9 @@ class Auth:
         # Ensure path ends with a slash for consistent comparison
         path = path if path.endswith('/') else path + '/'
 
+        if isinstance(excluded_paths, PathMatcher):
+            return not excluded_paths.matches(path)
+
         for excluded_path in excluded_paths:
             if excluded_path.endswith('*'):
                 if path.startswith(excluded_path[:-1]):
@@ -33,3 +82,15 @@ class Auth:
     def current_user(self, request=None) -> TypeVar('User'):
         """Get the current user from the request"""
         return None
+
+    def request_user(self, request=None) -> TypeVar('User'):
+        """Get the current user, resolved at most once per request
+
+        The result of current_user is memoized on flask.g, so views
+        and auth classes calling it again reuse the first lookup.
+        """
+        if request is None:
+            return None
+        if 'current_user' not in g:
+            g.current_user = self.current_user(request)
+        return g.current_user
@@ -1,15 +1,82 @@
 #!/usr/bin/env python3
 """BasicAuth class for Basic Authentication"""
 import base64
-from typing import TypeVar
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, TypeVar
 
 from models.user import User
 from api.v1.auth.auth import Auth
 
 
+class CredentialCache:
+    """Bounded LRU/TTL cache of verified Authorization headers
+
+    Entries are keyed on an HMAC of the raw header (with a per-process
+    secret, so headers are never kept in clear) and map to the user id
+    and the password hash seen at verification time. A hit is only
+    trusted while the user still exists with that same password hash.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        """Initialize an empty cache"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, authorization_header: str) -> bytes:
+        """Keyed hash of an Authorization header"""
+        return hmac.new(self._secret, authorization_header.encode('utf-8'),
+                        hashlib.sha256).digest()
+
+    def get(self, authorization_header: str) -> Optional[Tuple[str, str]]:
+        """Get the (user_id, password hash) cached for a header"""
+        if self.max_size <= 0:
+            return None
+        key = self._key(authorization_header)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put(self, authorization_header: str, user: TypeVar('User')):
+        """Cache a header verified for user"""
+        if self.max_size <= 0:
+            return
+        key = self._key(authorization_header)
+        with self._lock:
+            self._entries[key] = (user.id, user.password,
+                                  time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, authorization_header: str):
+        """Drop the entry of a header"""
+        with self._lock:
+            self._entries.pop(self._key(authorization_header), None)
+
+
 class BasicAuth(Auth):
     """Basic authentication class"""
 
+    def __init__(self):
+        """Initialize BasicAuth and its verified-credential cache"""
+        self.credential_cache = CredentialCache(
+            int(os.getenv('BASIC_AUTH_CACHE_SIZE', 1024)),
+            float(os.getenv('BASIC_AUTH_CACHE_TTL', 300)))
+
     def extract_base64_authorization_header(self, authorization_header: str) -> str:
         """Extract the Base64 part of the Authorization header"""
         if authorization_header is None or not isinstance(authorization_header, str):
@@ -71,6 +138,13 @@ class BasicAuth(Auth):
         if auth_header is None:
             return None
 
+        cached = self.credential_cache.get(auth_header)
+        if cached is not None:
+            user = User.get(cached[0])
+            if user is not None and user.password == cached[1]:
+                return user
+            self.credential_cache.discard(auth_header)
+
         base64_header = self.extract_base64_authorization_header(auth_header)
         if base64_header is None:
             return None
@@ -83,4 +157,7 @@ class BasicAuth(Auth):
         if email is None or pwd is None:
             return None
 
-        return self.user_object_from_credentials(email, pwd)
+        user = self.user_object_from_credentials(email, pwd)
+        if user is not None:
+            self.credential_cache.put(auth_header, user)
+        return user
@@ -2,14 +2,24 @@
 """ Session Authentication module
 """
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_backends import session_backend_from_env
 import uuid
 
 
 class SessionAuth(Auth):
     """ Session Authentication class
+    Sessions are kept in process unless SESSION_BACKEND selects a
+    backend shared by all the workers (see session_backends)
     """
     user_id_by_session_id = {}
 
+    def __init__(self):
+        """ Initialize, using the shared session backend if any
+        """
+        backend = session_backend_from_env()
+        if backend is not None:
+            self.user_id_by_session_id = backend
+
     def create_session(self, user_id: str = None) -> str:
         """ Creates a Session ID for a user_id
         """
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+""" Shared session backends module
+Backends used by SessionAuth instead of its in-process dict so that
+every worker process (or node) sees the same sessions:
+- MmapSessionBackend: hash table in a memory-mapped file, shared by
+  the processes of one host
+- RedisSessionBackend: any server speaking the Redis protocol (RESP)
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from os import getenv
+from urllib.parse import urlparse
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import socket
+import threading
+
+
+def dumps_session(value) -> bytes:
+    """ Serialize a session value (user_id or dict with created_at)
+    """
+    if isinstance(value, dict):
+        value = dict(value)
+        if isinstance(value.get('created_at'), datetime):
+            value['created_at'] = value['created_at'].isoformat()
+    return json.dumps(value).encode('utf-8')
+
+
+def loads_session(raw: bytes):
+    """ Deserialize a session value written by dumps_session
+    """
+    value = json.loads(raw.decode('utf-8'))
+    if isinstance(value, dict) and \
+            isinstance(value.get('created_at'), str):
+        value['created_at'] = datetime.fromisoformat(value['created_at'])
+    return value
+
+
+class SessionBackend:
+    """ Dict-like session storage shared between processes
+    """
+
+    def get(self, session_id: str, default=None):
+        """ Value of a session, or default
+        """
+        raise NotImplementedError
+
+    def __setitem__(self, session_id: str, value):
+        """ Store a session
+        """
+        raise NotImplementedError
+
+    def __delitem__(self, session_id: str):
+        """ Remove a session, KeyError if missing
+        """
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        """ Check if a session is held
+        """
+        return self.get(session_id) is not None
+
+    def __getitem__(self, session_id: str):
+        """ Value of a session, KeyError if missing
+        """
+        value = self.get(session_id)
+        if value is None:
+            raise KeyError(session_id)
+        return value
+
+    def configure(self, duration: int, max_sessions: int = 0):
+        """ Set the session duration in seconds (0: no expiry)
+        """
+        self.duration = duration
+
+    def start_sweeper(self, interval: float):
+        """ Expired sessions are dropped by the backend itself
+        """
+
+
+class MmapSessionBackend(SessionBackend):
+    """ Open-addressing hash table in a memory-mapped file
+    - fixed-size slots: state byte, key, value length and value
+    - linear probing with backward-shift deletion: removing a session
+      moves the rest of its probe run back, so lookups of unknown IDs
+      stop at the first empty slot (no tombstones accumulate)
+    - flock() serializes the processes, a lock the threads; the file is
+      opened per process so forked workers do not share one lock
+    - expired sessions are reclaimed when the table is full
+    """
+    SLOT_SIZE = 256
+    KEY_SIZE = 64
+    EMPTY, USED, DELETED = 0, 1, 2
+
+    def __init__(self, file_path: str, slots: int = 65536):
+        """ Create the table file if needed, it is mapped on first use
+        """
+        self.duration = 0
+        self.file_path = file_path
+        self._pid = None
+        self._open_lock = threading.Lock()
+        fd = os.open(file_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            if size < self.SLOT_SIZE:
+                size = slots * self.SLOT_SIZE
+                os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+        self.slots = size // self.SLOT_SIZE
+
+    def _open(self):
+        """ Open and map the file in the current process
+        A descriptor inherited through fork() shares its flock() with
+        the parent, so each process opens its own after forking. The
+        first thread of the process does it, _pid is set last so the
+        others wait for the whole setup.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._open_lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                self._map.close()
+                os.close(self._fd)
+            self._lock = threading.Lock()
+            self._fd = os.open(self.file_path, os.O_RDWR)
+            self._map = mmap.mmap(self._fd, self.slots * self.SLOT_SIZE)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if self.DELETED in self._map[::self.SLOT_SIZE]:
+                    self._rebuild()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._pid = pid
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """ Hold the thread lock and the file lock
+        """
+        self._open()
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive
+                        else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _home(self, key: bytes) -> int:
+        """ Slot index a key hashes to
+        """
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % self.slots
+
+    def _probe(self, key: bytes):
+        """ Slot offsets to visit for a key, in probing order
+        """
+        start = self._home(key)
+        for i in range(self.slots):
+            yield ((start + i) % self.slots) * self.SLOT_SIZE
+
+    def _find(self, key: bytes) -> int:
+        """ Offset of the slot holding key, or -1
+        """
+        for offset in self._probe(key):
+            state = self._map[offset]
+            if state == self.EMPTY:
+                return -1
+            if state == self.USED and self._slot_key(offset) == key:
+                return offset
+        return -1
+
+    def _slot_key(self, offset: int) -> bytes:
+        """ Key stored in a slot
+        """
+        return self._map[offset + 1:offset + 1 + self.KEY_SIZE] \
+            .rstrip(b'\0')
+
+    def _slot_value(self, offset: int) -> bytes:
+        """ Raw value stored in a slot
+        """
+        start = offset + 1 + self.KEY_SIZE
+        length = int.from_bytes(self._map[start:start + 2], 'big')
+        return self._map[start + 2:start + 2 + length]
+
+    def _key(self, session_id: str) -> bytes:
+        """ Slot key of a session ID
+        """
+        key = session_id.encode('utf-8')
+        if not key or len(key) > self.KEY_SIZE or b'\0' in key:
+            raise KeyError(session_id)
+        return key
+
+    def get(self, session_id: str, default=None):
+        """ Value of a session, or default
+        """
+        try:
+            key = self._key(session_id)
+        except KeyError:
+            return default
+        with self._locked(False):
+            offset = self._find(key)
+            if offset < 0:
+                return default
+            raw = self._slot_value(offset)
+        return loads_session(raw)
+
+    def __setitem__(self, session_id: str, value):
+        """ Store a session, RuntimeError if the table is full
+        """
+        key = self._key(session_id)
+        raw = dumps_session(value)
+        if len(raw) > self.SLOT_SIZE - 3 - self.KEY_SIZE:
+            raise ValueError("session value too large")
+        with self._locked(True):
+            offset = self._find(key)
+            if offset < 0:
+                offset = self._free_slot(key)
+            if offset < 0:
+                self._sweep()
+                offset = self._free_slot(key)
+            if offset < 0:
+                raise RuntimeError("session table is full")
+            self._write_slot(offset, key, raw)
+
+    def _write_slot(self, offset: int, key: bytes, raw: bytes):
+        """ Fill a slot with a key and its raw value
+        """
+        start = offset + 1 + self.KEY_SIZE
+        self._map[offset + 1:start] = key.ljust(self.KEY_SIZE, b'\0')
+        self._map[start:start + 2] = len(raw).to_bytes(2, 'big')
+        self._map[start + 2:start + 2 + len(raw)] = raw
+        self._map[offset] = self.USED
+
+    def _free_slot(self, key: bytes) -> int:
+        """ Offset of the first empty or deleted slot for key, or -1
+        """
+        for offset in self._probe(key):
+            if self._map[offset] != self.USED:
+                return offset
+        return -1
+
+    def __delitem__(self, session_id: str):
+        """ Remove a session, KeyError if missing
+        """
+        key = self._key(session_id)
+        with self._locked(True):
+            offset = self._find(key)
+            if offset < 0:
+                raise KeyError(session_id)
+            self._remove_slot(offset)
+
+    def _remove_slot(self, offset: int):
+        """ Empty a slot with backward-shift deletion
+        The following entries of the probe run that may live in the hole
+        are moved back into it, until an empty slot ends the run.
+        """
+        size = self.SLOT_SIZE
+        hole = offset // size
+        i = hole
+        for _ in range(self.slots - 1):
+            i = (i + 1) % self.slots
+            state = self._map[i * size]
+            if state == self.EMPTY:
+                break
+            if state == self.DELETED:
+                # tombstone left by an older version: keep the run open
+                self._map[hole * size] = self.DELETED
+                return
+            home = self._home(self._slot_key(i * size))
+            if (i - home) % self.slots >= (i - hole) % self.slots:
+                self._map[hole * size:(hole + 1) * size] = \
+                    self._map[i * size:(i + 1) * size]
+                hole = i
+        self._map[hole * size] = self.EMPTY
+
+    def _rebuild(self):
+        """ Reinsert every session into a cleared table, dropping the
+        tombstones (file lock held by the caller)
+        """
+        entries = []
+        for offset in range(0, self.slots * self.SLOT_SIZE, self.SLOT_SIZE):
+            if self._map[offset] == self.USED:
+                entries.append((self._slot_key(offset),
+                                bytes(self._slot_value(offset))))
+            self._map[offset] = self.EMPTY
+        for key, raw in entries:
+            self._write_slot(self._free_slot(key), key, raw)
+
+    def _sweep(self) -> int:
+        """ Drop the expired sessions (file lock held by the caller)
+        """
+        if self.duration <= 0:
+            return 0
+        now = datetime.now().timestamp()
+        expired = []
+        for offset in range(0, self.slots * self.SLOT_SIZE, self.SLOT_SIZE):
+            if self._map[offset] != self.USED:
+                continue
+            value = loads_session(self._slot_value(offset))
+            created_at = value.get('created_at') \
+                if isinstance(value, dict) else None
+            if isinstance(created_at, datetime) and \
+                    created_at.timestamp() + self.duration < now:
+                expired.append(self._slot_key(offset))
+        for key in expired:
+            self._remove_slot(self._find(key))
+        return len(expired)
+
+
+class RedisError(Exception):
+    """ Error reply of a Redis-protocol server
+    """
+
+
+class RedisSessionBackend(SessionBackend):
+    """ Sessions kept by a Redis-protocol server
+    - one connection per thread, reopened once on a connection error
+    - sessions get a TTL of the session duration, so the server drops
+      the expired ones by itself
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379,
+                 db: int = 0, prefix: str = 'session:',
+                 timeout: float = 2.0):
+        """ Initialize the client, connections are opened lazily
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.prefix = prefix
+        self.timeout = timeout
+        self.duration = 0
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url: str) -> 'RedisSessionBackend':
+        """ Client for a redis://host:port/db URL
+        """
+        parsed = urlparse(url)
+        db = parsed.path.lstrip('/')
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379,
+                   int(db) if db else 0)
+
+    def _connect(self):
+        """ Open the connection of the current thread
+        """
+        sock = socket.create_connection((self.host, self.port),
+                                        self.timeout)
+        self._local.sock = sock
+        self._local.reader = sock.makefile('rb')
+        if self.db:
+            self._send(('SELECT', str(self.db)))
+
+    def _close(self):
+        """ Close the connection of the current thread
+        """
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            self._local.reader.close()
+            sock.close()
+        self._local.sock = None
+
+    def _send(self, args) -> object:
+        """ Send one command on the open connection and read its reply
+        """
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self._local.sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self) -> object:
+        """ Parse one RESP reply
+        """
+        line = self._local.reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError("connection closed by the server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(payload.decode('utf-8'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RedisError("unknown reply type {!r}".format(kind))
+
+    def command(self, *args) -> object:
+        """ Run a command, reconnecting once if the connection dropped
+        """
+        for attempt in range(2):
+            if getattr(self._local, 'sock', None) is None:
+                self._connect()
+            try:
+                return self._send(args)
+            except (ConnectionError, OSError):
+                self._close()
+                if attempt:
+                    raise
+
+    def get(self, session_id: str, default=None):
+        """ Value of a session, or default
+        """
+        raw = self.command('GET', self.prefix + session_id)
+        return default if raw is None else loads_session(raw)
+
+    def __setitem__(self, session_id: str, value):
+        """ Store a session with the session duration as TTL
+        """
+        args = ['SET', self.prefix + session_id, dumps_session(value)]
+        if self.duration > 0:
+            args += ['EX', self.duration]
+        self.command(*args)
+
+    def __delitem__(self, session_id: str):
+        """ Remove a session, KeyError if missing
+        """
+        if not self.command('DEL', self.prefix + session_id):
+            raise KeyError(session_id)
+
+
+def session_backend_from_env():
+    """ Shared backend selected by SESSION_BACKEND, None for memory
+    - mmap: SESSION_MMAP_PATH (.sessions.mmap), SESSION_MMAP_SLOTS
+    - redis: SESSION_REDIS_URL (redis://localhost:6379/0)
+    """
+    kind = getenv('SESSION_BACKEND', 'memory')
+    if kind == 'mmap':
+        return MmapSessionBackend(
+            getenv('SESSION_MMAP_PATH', '.sessions.mmap'),
+            int(getenv('SESSION_MMAP_SLOTS', 65536)))
+    if kind == 'redis':
+        return RedisSessionBackend.from_url(
+            getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0'))
+    return None
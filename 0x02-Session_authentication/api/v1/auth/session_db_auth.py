@@ -2,13 +2,27 @@
 """ Session Database Authentication module
 """
 from api.v1.auth.session_exp_auth import SessionExpAuth
+from api.v1.auth.session_gc import start_session_gc
 from models.user_session import UserSession
 from datetime import datetime, timedelta
+from os import getenv
 
 
 class SessionDBAuth(SessionExpAuth):
     """ Session Database Authentication class
+    Expired UserSession objects are purged every SESSION_GC_INTERVAL
+    seconds when it is set
     """
+    def __init__(self):
+        """ Initialize and start the session garbage collector
+        """
+        super().__init__()
+        try:
+            gc_interval = float(getenv('SESSION_GC_INTERVAL', 0))
+        except ValueError:
+            gc_interval = 0
+        start_session_gc(gc_interval, self.session_duration)
+
     def create_session(self, user_id=None):
         """ Creates and stores new instance of UserSession
         """
@@ -24,7 +38,7 @@ class SessionDBAuth(SessionExpAuth):
         """
         if session_id is None:
             return None
-        UserSession.load_from_file()
+        UserSession.reload_if_changed()
         user_sessions = UserSession.search({'session_id': session_id})
         if not user_sessions:
             return None
@@ -2,20 +2,37 @@
 """ Session Expiration Authentication module
 """
 from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_store import SessionStore
 from datetime import datetime, timedelta
 from os import getenv
 
 
 class SessionExpAuth(SessionAuth):
     """ Session Expiration Authentication class
+    Sessions live in a SessionStore: expired ones are evicted by a
+    background sweeper every SESSION_SWEEP_INTERVAL seconds (60 by
+    default) and at most SESSION_MAX_COUNT sessions are kept (no limit
+    by default), least recently used first out.
     """
+    user_id_by_session_id = SessionStore()
+
     def __init__(self):
         """ Initialize
         """
+        super().__init__()
         try:
             self.session_duration = int(getenv('SESSION_DURATION', 0))
         except ValueError:
             self.session_duration = 0
+        try:
+            max_sessions = int(getenv('SESSION_MAX_COUNT', 0))
+            sweep_interval = float(getenv('SESSION_SWEEP_INTERVAL', 60))
+        except ValueError:
+            max_sessions, sweep_interval = 0, 60
+        self.user_id_by_session_id.configure(self.session_duration,
+                                             max_sessions)
+        if self.session_duration > 0:
+            self.user_id_by_session_id.start_sweeper(sweep_interval)
 
     def create_session(self, user_id=None):
         """ Creates a Session ID with expiration
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+""" Expired UserSession garbage collection module
+Run it from the CLI:
+    SESSION_DURATION=3600 python3 -m api.v1.auth.session_gc
+or in process with start_session_gc(interval).
+"""
+from datetime import datetime, timedelta
+from os import getenv
+import threading
+import time
+from models.user_session import UserSession
+
+PAGE_SIZE = 1000
+_gc_thread = None
+
+
+def collect_expired_sessions(session_duration: int) -> dict:
+    """ Delete every UserSession older than session_duration seconds
+    in one rewrite of the storage
+    Return:
+      - dict with the number of sessions reclaimed and bytes saved
+    """
+    if session_duration <= 0:
+        return {'reclaimed': 0, 'bytes_saved': 0}
+    UserSession.reload_if_changed()
+    size_before = UserSession.storage_size()
+    deadline = datetime.now() - timedelta(seconds=session_duration)
+
+    expired = []
+    after = None
+    while True:
+        user_sessions = UserSession.page(after, PAGE_SIZE)
+        for user_session in user_sessions:
+            if user_session.created_at < deadline:
+                expired.append(user_session.id)
+        if len(user_sessions) < PAGE_SIZE:
+            break
+        after = user_sessions[-1].id
+
+    reclaimed = UserSession.remove_many(expired) if expired else 0
+    return {'reclaimed': reclaimed,
+            'bytes_saved': size_before - UserSession.storage_size()}
+
+
+def start_session_gc(interval: float, session_duration: int):
+    """ Run collect_expired_sessions every `interval` seconds in a
+    daemon thread (started once per process)
+    """
+    global _gc_thread
+    if _gc_thread is not None or interval <= 0 or session_duration <= 0:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            collect_expired_sessions(session_duration)
+
+    _gc_thread = threading.Thread(target=run, daemon=True)
+    _gc_thread.start()
+
+
+if __name__ == '__main__':
+    report = collect_expired_sessions(int(getenv('SESSION_DURATION', 0)))
+    print("reclaimed {} sessions, {} bytes saved".format(
+        report['reclaimed'], report['bytes_saved']))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+""" Expiring session store module
+"""
+from collections import OrderedDict
+from datetime import datetime
+import heapq
+import threading
+import time
+
+
+class SessionStore:
+    """ In-memory session store with expiry index and LRU cap
+    - behaves like the dict it replaces: session_id -> session value
+    - values holding a 'created_at' datetime are pushed on a min-heap
+      ordered by expiry time, so sweep() evicts expired sessions in
+      amortized O(1) (overwritten entries are skipped lazily)
+    - with max_sessions > 0 the least recently used session is evicted
+      when the store is full
+    """
+
+    def __init__(self, duration: int = 0, max_sessions: int = 0):
+        """ Initialize an empty store
+        """
+        self.duration = duration
+        self.max_sessions = max_sessions
+        self.expired = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+        self._expires_at = {}
+        self._heap = []
+        self._lock = threading.RLock()
+        self._sweeper = None
+
+    def configure(self, duration: int, max_sessions: int = 0):
+        """ Set the session duration (in seconds) and the size cap
+        """
+        with self._lock:
+            self.duration = duration
+            self.max_sessions = max_sessions
+
+    def __len__(self) -> int:
+        """ Number of sessions held, expired ones not swept yet included
+        """
+        return len(self._entries)
+
+    def __contains__(self, session_id: str) -> bool:
+        """ Check if a session is held
+        """
+        return session_id in self._entries
+
+    def __getitem__(self, session_id: str):
+        """ Value of a session, marked as recently used
+        """
+        with self._lock:
+            value = self._entries[session_id]
+            self._entries.move_to_end(session_id)
+            return value
+
+    def get(self, session_id: str, default=None):
+        """ Value of a session, or default
+        """
+        try:
+            return self[session_id]
+        except KeyError:
+            return default
+
+    def __setitem__(self, session_id: str, value):
+        """ Store a session and index its expiry time
+        """
+        with self._lock:
+            self._entries[session_id] = value
+            self._entries.move_to_end(session_id)
+            self._expires_at.pop(session_id, None)
+            created_at = value.get('created_at') \
+                if isinstance(value, dict) else None
+            if self.duration > 0 and isinstance(created_at, datetime):
+                expires_at = created_at.timestamp() + self.duration
+                self._expires_at[session_id] = expires_at
+                heapq.heappush(self._heap, (expires_at, session_id))
+            while self.max_sessions > 0 and \
+                    len(self._entries) > self.max_sessions:
+                old_id, _ = self._entries.popitem(last=False)
+                self._expires_at.pop(old_id, None)
+                self.evicted += 1
+
+    def __delitem__(self, session_id: str):
+        """ Remove a session
+        """
+        with self._lock:
+            del self._entries[session_id]
+            self._expires_at.pop(session_id, None)
+
+    def sweep(self) -> int:
+        """ Evict the expired sessions, return how many were evicted
+        """
+        now = datetime.now().timestamp()
+        count = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] < now:
+                expires_at, session_id = heapq.heappop(self._heap)
+                if self._expires_at.get(session_id) != expires_at:
+                    continue
+                del self._expires_at[session_id]
+                del self._entries[session_id]
+                count += 1
+            if len(self._heap) > 2 * len(self._expires_at) + 64:
+                self._heap = [(t, s) for s, t in self._expires_at.items()]
+                heapq.heapify(self._heap)
+            self.expired += count
+        return count
+
+    def stats(self) -> dict:
+        """ Live, expired and LRU-evicted session counters
+        """
+        with self._lock:
+            return {'live': len(self._entries), 'expired': self.expired,
+                    'evicted': self.evicted}
+
+    def start_sweeper(self, interval: float):
+        """ Run sweep() every `interval` seconds in a daemon thread
+        """
+        with self._lock:
+            if self._sweeper is not None or interval <= 0:
+                return
+
+            def run():
+                while True:
+                    time.sleep(interval)
+                    self.sweep()
+
+            self._sweeper = threading.Thread(target=run, daemon=True)
+            self._sweeper.start()
@@ -2,18 +2,62 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import abort, jsonify, request, Response
 from models.user import User
+import json
+
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+
+def stream_users(after: str = None):
+    """ Yield a JSON array of all users, one page at a time
+    """
+    yield '['
+    first = True
+    while True:
+        users = User.page(after, STREAM_BATCH_SIZE)
+        for user in users:
+            yield ('' if first else ',') + json.dumps(user.to_json())
+            first = False
+        if len(users) < STREAM_BATCH_SIZE:
+            break
+        after = users[-1].id
+    yield ']'
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (optional):
+      - limit: page size (capped to MAX_PAGE_SIZE), users ordered by ID
+      - cursor: ID of the last user of the previous page
+      - stream: when set, the whole list is streamed page by page
     Return:
-      - list of all User objects JSON represented
+      - list of User objects JSON represented; for a full page the
+        X-Next-Cursor header gives the cursor of the next one
+      - 400 if limit is not a positive integer
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    cursor = request.args.get('cursor')
+    if request.args.get('stream'):
+        return Response(stream_users(cursor), mimetype='application/json')
+
+    limit = request.args.get('limit')
+    if limit is None and cursor is None:
+        all_users = [user.to_json() for user in User.all()]
+        return jsonify(all_users)
+
+    try:
+        limit = int(limit) if limit is not None else MAX_PAGE_SIZE
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return jsonify({'error': "limit must be a positive integer"}), 400
+    users = User.page(cursor, min(limit, MAX_PAGE_SIZE))
+    response = jsonify([user.to_json() for user in users])
+    if len(users) == min(limit, MAX_PAGE_SIZE):
+        response.headers['X-Next-Cursor'] = users[-1].id
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+""" Models package
+The storage engine is picked with MODELS_STORAGE:
+- file (default): JSON files, see models.engine.file_storage
+- sqlite: SQLite database at MODELS_SQLITE_PATH
+"""
+from os import getenv
+
+if getenv('MODELS_STORAGE', 'file') == 'sqlite':
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage(getenv('MODELS_SQLITE_PATH', '.db.sqlite3'))
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage(float(getenv('MODELS_FLUSH_INTERVAL', 0)))
@@ -3,37 +3,76 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
-import json
 import uuid
+import models
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
-DATA = {}
+ATTRIBUTES = {}
 
 
 class Base():
     """ Base class
+    Instances are slotted: subclasses list their attributes in
+    __slots__ and to_json() serializes them in declaration order.
+    Timestamps read from a file are kept as strings until accessed.
+    Persistence is delegated to the engine in models.storage.
     """
 
+    __slots__ = ('id', '_created_at', '_updated_at')
+    __indexes__ = ()
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
-        s_class = str(self.__class__.__name__)
-        if DATA.get(s_class) is None:
-            DATA[s_class] = {}
-
         self.id = kwargs.get('id', str(uuid.uuid4()))
-        if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
-        else:
-            self.created_at = datetime.utcnow()
-        if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
-        else:
-            self.updated_at = datetime.utcnow()
+        self._created_at = kwargs.get('created_at') or datetime.utcnow()
+        self._updated_at = kwargs.get('updated_at') or datetime.utcnow()
+
+    @property
+    def created_at(self) -> datetime:
+        """ Creation date, parsed on first access
+        """
+        if type(self._created_at) is str:
+            self._created_at = datetime.fromisoformat(self._created_at)
+        return self._created_at
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        """ Setter of the creation date
+        """
+        self._created_at = value
+
+    @property
+    def updated_at(self) -> datetime:
+        """ Last update date, parsed on first access
+        """
+        if type(self._updated_at) is str:
+            self._updated_at = datetime.fromisoformat(self._updated_at)
+        return self._updated_at
+
+    @updated_at.setter
+    def updated_at(self, value: datetime):
+        """ Setter of the last update date
+        """
+        self._updated_at = value
+
+    @classmethod
+    def _attributes(cls) -> tuple:
+        """ Slotted attributes declared by the subclasses of Base
+        """
+        attributes = ATTRIBUTES.get(cls)
+        if attributes is None:
+            attributes = []
+            for klass in reversed(cls.__mro__):
+                if klass is Base or not issubclass(klass, Base):
+                    continue
+                slots = klass.__dict__.get('__slots__', ())
+                if isinstance(slots, str):
+                    slots = (slots,)
+                attributes.extend(slots)
+            attributes = ATTRIBUTES.setdefault(cls, tuple(attributes))
+        return attributes
 
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
@@ -47,10 +86,16 @@ class Base():
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
-        result = {}
-        for key, value in self.__dict__.items():
+        result = {'id': self.id}
+        for key, value in (('created_at', self._created_at),
+                           ('updated_at', self._updated_at)):
+            if type(value) is datetime:
+                value = value.strftime(TIMESTAMP_FORMAT)
+            result[key] = value
+        for key in self.__class__._attributes():
             if not for_serialization and key[0] == '_':
                 continue
+            value = getattr(self, key, None)
             if type(value) is datetime:
                 result[key] = value.strftime(TIMESTAMP_FORMAT)
             else:
@@ -61,52 +106,54 @@ class Base():
     def load_from_file(cls):
         """ Load all objects from file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        models.storage.load(cls)
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @classmethod
+    def reload_if_changed(cls):
+        """ Load all objects from file if it changed since last read
+        """
+        models.storage.refresh(cls)
+
+    @classmethod
+    def invalidate(cls):
+        """ Notify that the file changed: next reload_if_changed loads it
+        """
+        models.storage.invalidate(cls)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
-
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+        models.storage.save_all(cls)
 
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        models.storage.save(self)
 
     def remove(self):
         """ Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        models.storage.remove(self)
+
+    @classmethod
+    def remove_many(cls, ids: List[str]) -> int:
+        """ Remove objects by ID with a single write of the storage
+        """
+        return models.storage.remove_many(cls, ids)
+
+    @classmethod
+    def storage_size(cls) -> int:
+        """ Bytes used on disk to store the objects
+        """
+        return models.storage.size(cls)
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
-        s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        return models.storage.count(cls)
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
@@ -114,24 +161,22 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def page(cls, after: str = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ Return at most `limit` objects ordered by ID, starting
+        after the ID `after`
+        """
+        return models.storage.page(cls, after, limit)
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        return models.storage.get(cls, id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
-        s_class = cls.__name__
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for k, v in attributes.items():
-                if (getattr(obj, k) != v):
-                    return False
-            return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+        return models.storage.search(cls, attributes)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+""" JSON file storage engine
+"""
+from bisect import bisect_left, bisect_right, insort
+from os import getenv, path
+from typing import TypeVar, List
+import json
+import os
+import threading
+from models.engine.storage import Storage
+from models.locks import RWLock
+from models.scheduler import PersistenceScheduler
+
+
+DATA = {}
+INDEXES = {}
+SORTED_IDS = {}
+JOURNAL_COMPACT_BYTES = int(getenv('MODELS_JOURNAL_COMPACT_BYTES',
+                                   1024 * 1024))
+
+
+class FileStorage(Storage):
+    """ Keep every object in memory, persisted in one JSON file per class
+    - .db_<Class>.json is a snapshot of the class
+    - .db_<Class>.journal holds the changes made since the snapshot,
+      one JSON line per saved object or removal tombstone
+    - equality searches on __indexes__ attributes use in-memory indexes
+    - SORTED_IDS keeps the IDs of a class sorted for pagination
+    - DATA and INDEXES of a class are guarded by a reader/writer lock
+    - the (mtime, size) of the files seen at the last load or own write
+      tell refresh() whether another process changed them
+    """
+
+    def __init__(self, flush_interval: float = 0):
+        """ Initialize the storage
+        """
+        self._file_locks = {}
+        self._data_locks = {}
+        self._compacting = set()
+        self._signatures = {}
+        self.scheduler = PersistenceScheduler(self._write_journal,
+                                              flush_interval)
+
+    def _file_lock(self, cls: type) -> threading.Lock:
+        """ Lock serializing the file I/O of the class
+        """
+        return self._file_locks.setdefault(cls.__name__, threading.Lock())
+
+    def _data_lock(self, cls: type) -> RWLock:
+        """ Reader/writer lock guarding DATA and INDEXES of the class
+        """
+        lock = self._data_locks.get(cls.__name__)
+        if lock is None:
+            lock = self._data_locks.setdefault(cls.__name__, RWLock())
+        return lock
+
+    def _data(self, cls: type) -> dict:
+        """ Objects of the class by ID, created empty on first use
+        """
+        s_class = cls.__name__
+        if DATA.get(s_class) is None:
+            with self._data_lock(cls).write():
+                if DATA.get(s_class) is None:
+                    INDEXES[s_class] = self._new_indexes(cls)
+                    SORTED_IDS[s_class] = []
+                    DATA[s_class] = {}
+        return DATA[s_class]
+
+    @staticmethod
+    def _signature(cls: type) -> tuple:
+        """ (mtime, size) of the snapshot and the journal of the class
+        """
+        signature = []
+        for file_path in (".db_{}.json".format(cls.__name__),
+                          ".db_{}.journal".format(cls.__name__)):
+            try:
+                stat = os.stat(file_path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def refresh(self, cls: type):
+        """ Reload the class only if its files changed since they were
+        last loaded or written by this process, or if it was
+        invalidated
+        """
+        s_class = cls.__name__
+        with self._file_lock(cls):
+            changed = self._signatures.get(s_class) != self._signature(cls)
+        if changed:
+            self.load(cls)
+
+    def invalidate(self, cls: type):
+        """ Force the next refresh() of the class to reload it
+        """
+        with self._file_lock(cls):
+            self._signatures.pop(cls.__name__, None)
+
+    def load(self, cls: type):
+        """ Load all objects from file
+        The JSON snapshot is read first, then the journal is replayed.
+        Objects and indexes are built aside and swapped in at once, so
+        readers keep a consistent view while the file is parsed.
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        journal_path = ".db_{}.journal".format(s_class)
+        self.scheduler.flush(cls)
+        data = {}
+        indexes = self._new_indexes(cls)
+
+        with self._file_lock(cls):
+            if path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    objs_json = json.load(f)
+                    for obj_id, obj_json in objs_json.items():
+                        data[obj_id] = cls(**obj_json)
+
+            if path.exists(journal_path):
+                with open(journal_path, 'r') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            # torn last line of an interrupted append
+                            break
+                        if entry.get('op') == 'remove':
+                            data.pop(entry.get('id'), None)
+                        else:
+                            obj = cls(**entry.get('obj'))
+                            data[obj.id] = obj
+            self._signatures[s_class] = self._signature(cls)
+
+        for obj in data.values():
+            self._index_add(cls, obj, indexes)
+        sorted_ids = sorted(data)
+        with self._data_lock(cls).write():
+            DATA[s_class] = data
+            INDEXES[s_class] = indexes
+            SORTED_IDS[s_class] = sorted_ids
+
+    def save_all(self, cls: type):
+        """ Save all objects to file
+        Writes a full snapshot and truncates the journal (compaction).
+        The snapshot goes to a temporary file renamed over the previous
+        one, so a crash never leaves a truncated store behind.
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        journal_path = ".db_{}.journal".format(s_class)
+        tmp_path = file_path + ".tmp"
+
+        with self._file_lock(cls):
+            self._data(cls)
+            with self._data_lock(cls).read():
+                objs = list(DATA[s_class].items())
+            objs_json = {}
+            for obj_id, obj in objs:
+                objs_json[obj_id] = obj.to_json(True)
+
+            with open(tmp_path, 'w') as f:
+                json.dump(objs_json, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+            if path.exists(journal_path):
+                os.remove(journal_path)
+            self._signatures[s_class] = self._signature(cls)
+
+    def _write_journal(self, cls: type, entries: List[dict]):
+        """ Append changes to the journal of the class in one write
+        A background compaction is started once the journal grows past
+        JOURNAL_COMPACT_BYTES
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        lines = ''.join(json.dumps(entry) + '\n' for entry in entries)
+
+        with self._file_lock(cls):
+            up_to_date = self._signatures.get(s_class) == \
+                self._signature(cls)
+            with open(journal_path, 'a') as f:
+                f.write(lines)
+                size = f.tell()
+            if up_to_date:
+                self._signatures[s_class] = self._signature(cls)
+            if size < JOURNAL_COMPACT_BYTES or s_class in self._compacting:
+                return
+            self._compacting.add(s_class)
+
+        threading.Thread(target=self._compact, args=(cls,),
+                         daemon=True).start()
+
+    def _compact(self, cls: type):
+        """ Fold the journal into the snapshot
+        """
+        try:
+            self.save_all(cls)
+        finally:
+            self._compacting.discard(cls.__name__)
+
+    def save(self, obj: TypeVar('Base')):
+        """ Save an object and schedule its journal entry
+        """
+        cls = obj.__class__
+        self._data(cls)
+        with self._data_lock(cls).write():
+            data = DATA[cls.__name__]
+            if obj.id not in data:
+                insort(SORTED_IDS[cls.__name__], obj.id)
+            data[obj.id] = obj
+            self._index_add(cls, obj, INDEXES[cls.__name__])
+        self.scheduler.schedule(cls, obj.id,
+                                {'op': 'save', 'obj': obj.to_json(True)})
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Remove an object and schedule its tombstone
+        """
+        cls = obj.__class__
+        self._data(cls)
+        with self._data_lock(cls).write():
+            removed = DATA[cls.__name__].pop(obj.id, None) is not None
+            if removed:
+                self._index_remove(obj.id, INDEXES[cls.__name__])
+                sorted_ids = SORTED_IDS[cls.__name__]
+                del sorted_ids[bisect_left(sorted_ids, obj.id)]
+        if removed:
+            self.scheduler.schedule(cls, obj.id,
+                                    {'op': 'remove', 'id': obj.id})
+
+    def remove_many(self, cls: type, ids: List[str]) -> int:
+        """ Remove objects and rewrite the snapshot once
+        Pending journal entries are flushed first so the snapshot
+        supersedes all of them.
+        """
+        s_class = cls.__name__
+        self._data(cls)
+        count = 0
+        with self._data_lock(cls).write():
+            data = DATA[s_class]
+            sorted_ids = SORTED_IDS[s_class]
+            for obj_id in ids:
+                if data.pop(obj_id, None) is None:
+                    continue
+                self._index_remove(obj_id, INDEXES[s_class])
+                del sorted_ids[bisect_left(sorted_ids, obj_id)]
+                count += 1
+        if count:
+            self.scheduler.flush(cls)
+            self.save_all(cls)
+        return count
+
+    def size(self, cls: type) -> int:
+        """ Bytes of the snapshot and the journal of the class
+        """
+        size = 0
+        for file_path in (".db_{}.json".format(cls.__name__),
+                          ".db_{}.journal".format(cls.__name__)):
+            if path.exists(file_path):
+                size += path.getsize(file_path)
+        return size
+
+    @staticmethod
+    def _new_indexes(cls: type) -> dict:
+        """ Empty secondary indexes of the class
+        - ['by_attr'][attr][value] is an ordered set of ids
+        - ['by_id'][id] keeps the indexed values of an object so the
+          stale entries can be dropped on the next save
+        """
+        return {
+            'by_attr': {attr: {} for attr in cls.__indexes__},
+            'by_id': {}
+        }
+
+    @classmethod
+    def _index_add(cls, model: type, obj: TypeVar('Base'), index: dict):
+        """ Index (or re-index) the declared attributes of an object
+        """
+        if not model.__indexes__:
+            return
+        cls._index_remove(obj.id, index)
+        values = {}
+        for attr in model.__indexes__:
+            value = getattr(obj, attr, None)
+            values[attr] = value
+            index['by_attr'][attr].setdefault(value, {})[obj.id] = None
+        index['by_id'][obj.id] = values
+
+    @staticmethod
+    def _index_remove(obj_id: str, index: dict):
+        """ Drop an object from the secondary indexes
+        """
+        values = index['by_id'].pop(obj_id, None)
+        if values is None:
+            return
+        for attr, value in values.items():
+            ids = index['by_attr'][attr].get(value)
+            if ids is None:
+                continue
+            ids.pop(obj_id, None)
+            if not ids:
+                del index['by_attr'][attr][value]
+
+    def count(self, cls: type) -> int:
+        """ Count all objects
+        """
+        self._data(cls)
+        with self._data_lock(cls).read():
+            return len(DATA[cls.__name__].keys())
+
+    def get(self, cls: type, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        self._data(cls)
+        with self._data_lock(cls).read():
+            return DATA[cls.__name__].get(id)
+
+    def search(self, cls: type,
+               attributes: dict) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+        Equality on an attribute listed in __indexes__ is resolved with
+        the secondary index (as of the last save), other attributes are
+        then checked on the candidates only.
+        """
+        s_class = cls.__name__
+        def _search(obj):
+            if len(attributes) == 0:
+                return True
+            for k, v in attributes.items():
+                if (getattr(obj, k) != v):
+                    return False
+            return True
+
+        self._data(cls)
+        with self._data_lock(cls).read():
+            objs = DATA[s_class].values()
+            for attr in cls.__indexes__:
+                if attr in attributes:
+                    ids = INDEXES[s_class]['by_attr'][attr].get(
+                        attributes[attr], {})
+                    objs = [DATA[s_class][obj_id] for obj_id in ids]
+                    break
+
+            return list(filter(_search, objs))
+
+    def page(self, cls: type, after: str = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ At most `limit` objects ordered by ID, after the ID `after`
+        """
+        self._data(cls)
+        with self._data_lock(cls).read():
+            data = DATA[cls.__name__]
+            sorted_ids = SORTED_IDS[cls.__name__]
+            start = 0 if after is None else bisect_right(sorted_ids, after)
+            return [data[obj_id]
+                    for obj_id in sorted_ids[start:start + limit]]
+
+    def flush(self):
+        """ Write every pending change to disk
+        """
+        self.scheduler.flush()
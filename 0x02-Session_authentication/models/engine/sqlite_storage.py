@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+""" Embedded SQLite storage engine
+"""
+from typing import TypeVar, List
+import json
+import sqlite3
+import threading
+from models.engine.storage import Storage
+
+
+class SQLiteStorage(Storage):
+    """ Keep the objects in an SQLite database instead of in memory
+    - one table per class: `id` primary key, the serialized object in
+      `data`, and one indexed column per __indexes__ attribute
+    - get, count and indexed searches are SQL queries, so the dataset
+      never has to fit in the memory of the worker
+    - every thread uses its own connection; WAL lets readers run while
+      a write is in progress
+    """
+
+    def __init__(self, db_path: str = ".db.sqlite3"):
+        """ Initialize the storage
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._tables = set()
+        self._tables_lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """ Connection of the current thread
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _table(self, cls: type) -> str:
+        """ Quoted table name of the class, created on first use
+        Indexed columns added to __indexes__ later are created and
+        filled from the stored JSON.
+        """
+        table = '"{}"'.format(cls.__name__)
+        if cls.__name__ in self._tables:
+            return table
+
+        with self._tables_lock, self._conn as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS {} '
+                         '(id TEXT PRIMARY KEY, data TEXT NOT NULL)'
+                         .format(table))
+            columns = {row[1] for row in
+                       conn.execute('PRAGMA table_info({})'.format(table))}
+            for attr in cls.__indexes__:
+                if attr not in columns:
+                    conn.execute('ALTER TABLE {} ADD COLUMN "{}"'
+                                 .format(table, attr))
+                    conn.execute('UPDATE {} SET "{}" = '
+                                 'json_extract(data, \'$."{}"\')'
+                                 .format(table, attr, attr))
+                conn.execute('CREATE INDEX IF NOT EXISTS "ix_{}_{}" '
+                             'ON {} ("{}")'
+                             .format(cls.__name__, attr, table, attr))
+            self._tables.add(cls.__name__)
+        return table
+
+    def load(self, cls: type):
+        """ Nothing to load: queries always read the database
+        """
+        self._table(cls)
+
+    def refresh(self, cls: type):
+        """ Nothing to refresh: queries always read the database
+        """
+        self._table(cls)
+
+    def save_all(self, cls: type):
+        """ Nothing to write: every save is already committed
+        """
+        self._table(cls)
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or replace the row of an object
+        """
+        cls = obj.__class__
+        table = self._table(cls)
+        columns = ['id', 'data'] + ['"{}"'.format(attr)
+                                    for attr in cls.__indexes__]
+        values = [obj.id, json.dumps(obj.to_json(True))]
+        values += [getattr(obj, attr, None) for attr in cls.__indexes__]
+        with self._conn as conn:
+            conn.execute('INSERT OR REPLACE INTO {} ({}) VALUES ({})'
+                         .format(table, ', '.join(columns),
+                                 ', '.join('?' * len(columns))),
+                         values)
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete the row of an object
+        """
+        table = self._table(obj.__class__)
+        with self._conn as conn:
+            conn.execute('DELETE FROM {} WHERE id = ?'.format(table),
+                         (obj.id,))
+
+    def remove_many(self, cls: type, ids: List[str]) -> int:
+        """ Delete rows by ID in one transaction, then VACUUM the file
+        """
+        table = self._table(cls)
+        ids = list(ids)
+        count = 0
+        with self._conn as conn:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                count += conn.execute(
+                    'DELETE FROM {} WHERE id IN ({})'.format(
+                        table, ', '.join('?' * len(chunk))),
+                    chunk).rowcount
+        if count:
+            self._conn.execute('VACUUM')
+            self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return count
+
+    def size(self, cls: type) -> int:
+        """ Bytes of the whole database (all the classes share it)
+        """
+        conn = self._conn
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return page_count * page_size
+
+    def count(self, cls: type) -> int:
+        """ Count all objects
+        """
+        table = self._table(cls)
+        return self._conn.execute(
+            'SELECT COUNT(*) FROM {}'.format(table)).fetchone()[0]
+
+    def get(self, cls: type, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        table = self._table(cls)
+        row = self._conn.execute(
+            'SELECT data FROM {} WHERE id = ?'.format(table),
+            (id,)).fetchone()
+        return None if row is None else cls(**json.loads(row[0]))
+
+    def search(self, cls: type,
+               attributes: dict) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+        Indexed attributes go in the WHERE clause, the others are
+        checked on the returned objects.
+        """
+        table = self._table(cls)
+        where = []
+        params = []
+        for attr in cls.__indexes__:
+            if attr in attributes:
+                where.append('"{}" IS ?'.format(attr))
+                params.append(attributes[attr])
+        query = 'SELECT data FROM {}'.format(table)
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += ' ORDER BY rowid'
+
+        result = []
+        for row in self._conn.execute(query, params):
+            obj = cls(**json.loads(row[0]))
+            if all(getattr(obj, k) == v for k, v in attributes.items()):
+                result.append(obj)
+        return result
+
+    def page(self, cls: type, after: str = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ At most `limit` objects ordered by ID, after the ID `after`
+        """
+        table = self._table(cls)
+        rows = self._conn.execute(
+            'SELECT data FROM {} WHERE id > ? ORDER BY id LIMIT ?'
+            .format(table), ('' if after is None else after, limit))
+        return [cls(**json.loads(row[0])) for row in rows]
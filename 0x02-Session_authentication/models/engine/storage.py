@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+""" Storage interface module
+"""
+from typing import TypeVar, List
+
+
+class Storage():
+    """ Interface of the storage engines used by models.base.Base
+    Every method receives the model class it works on, so a single
+    engine instance serves all the models.
+    """
+
+    def load(self, cls: type):
+        """ (Re)load the objects of a class from the storage
+        """
+        raise NotImplementedError
+
+    def refresh(self, cls: type):
+        """ Reload the objects of a class only if the storage changed
+        """
+        raise NotImplementedError
+
+    def invalidate(self, cls: type):
+        """ Force the next refresh() of a class to reload it
+        """
+
+    def save_all(self, cls: type):
+        """ Persist every object of a class in one go
+        """
+        raise NotImplementedError
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or update one object
+        """
+        raise NotImplementedError
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete one object
+        """
+        raise NotImplementedError
+
+    def remove_many(self, cls: type, ids: List[str]) -> int:
+        """ Delete the objects of a class with these IDs in one write,
+        return how many were deleted
+        """
+        raise NotImplementedError
+
+    def size(self, cls: type) -> int:
+        """ Bytes used on disk by the storage of a class
+        """
+        raise NotImplementedError
+
+    def count(self, cls: type) -> int:
+        """ Number of objects of a class
+        """
+        raise NotImplementedError
+
+    def get(self, cls: type, id: str) -> TypeVar('Base'):
+        """ One object by ID, or None
+        """
+        raise NotImplementedError
+
+    def search(self, cls: type,
+               attributes: dict) -> List[TypeVar('Base')]:
+        """ Objects of a class whose attributes equal `attributes`
+        """
+        raise NotImplementedError
+
+    def page(self, cls: type, after: str = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ At most `limit` objects of a class ordered by ID, starting
+        after the ID `after` (from the first one when None)
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """ Write every pending change
+        """
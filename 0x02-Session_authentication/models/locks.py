@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+""" Locks module
+"""
+from contextlib import contextmanager
+import threading
+
+
+class RWLock():
+    """ Reader/writer lock
+    - any number of readers can hold the lock together
+    - a writer holds it alone; once a writer waits, new readers queue
+      behind it so writers are not starved
+    """
+
+    def __init__(self):
+        """ Initialize the lock
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        """ Hold the lock as a reader
+        """
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        """ Hold the lock as the only writer
+        """
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
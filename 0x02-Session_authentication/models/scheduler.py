@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+""" Persistence scheduler module
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List
+import atexit
+import threading
+
+
+class PersistenceScheduler():
+    """ Coalesce model writes and flush them at most once per interval
+    - schedule() marks a class dirty with one pending journal entry per
+      object id (the last change of an object wins)
+    - pending entries are written by flush(), called by a timer
+      `interval` seconds after the first change, explicitly, or at exit
+    - with an interval of 0 every change is written right away
+    - writer(cls, entries) does the actual write of a class batch
+    """
+
+    def __init__(self, writer: Callable[[type, List[dict]], None],
+                 interval: float = 0):
+        """ Initialize the scheduler
+        """
+        self._writer = writer
+        self.interval = interval
+        self._pending: Dict[type, OrderedDict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def schedule(self, cls: type, obj_id: str, entry: dict):
+        """ Record a pending journal entry of a class
+        """
+        with self._lock:
+            pending = self._pending.setdefault(cls, OrderedDict())
+            pending.pop(obj_id, None)
+            pending[obj_id] = entry
+            if self.interval > 0 and self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if self.interval <= 0:
+            self.flush(cls)
+
+    def flush(self, cls: type = None):
+        """ Write the pending entries of one class, or of every class
+        """
+        with self._flush_lock:
+            with self._lock:
+                if cls is None:
+                    batches = self._pending
+                    self._pending = {}
+                    if self._timer is not None:
+                        self._timer.cancel()
+                        self._timer = None
+                else:
+                    pending = self._pending.pop(cls, None)
+                    batches = {cls: pending} if pending else {}
+
+            for dirty_cls, pending in batches.items():
+                self._writer(dirty_cls, list(pending.values()))
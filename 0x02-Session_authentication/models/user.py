@@ -1,14 +1,78 @@
 #!/usr/bin/env python3
 """ User module
+Passwords are stored as a hex SHA256 digest (legacy default) or, with
+PASSWORD_KDF set, as "<kdf>$<params>$<salt>$<hash>" using:
+- pbkdf2_sha256: PASSWORD_PBKDF2_ITERATIONS rounds (600000)
+- scrypt: n=2**14, r=8, p=1
+Legacy SHA256 passwords are rehashed with PASSWORD_KDF and saved on the
+next successful check. Successful verifications can be cached
+(PASSWORD_VERIFY_CACHE entries, 0 by default) to keep slow KDFs cheap
+for repeated logins.
 """
+from collections import OrderedDict
+from os import getenv
 import hashlib
+import hmac
+import os
+import threading
 from models.base import Base
 
+PASSWORD_KDF = getenv('PASSWORD_KDF', 'sha256')
+PBKDF2_ITERATIONS = int(getenv('PASSWORD_PBKDF2_ITERATIONS', 600000))
+SCRYPT_PARAMS = (2 ** 14, 8, 1)
+VERIFY_CACHE_SIZE = int(getenv('PASSWORD_VERIFY_CACHE', 0))
+
+_verified = OrderedDict()
+_verified_lock = threading.Lock()
+_verified_secret = os.urandom(32)
+
+
+def hash_password(pwd: str, kdf: str = None) -> str:
+    """ Encode a password with a KDF, parameters stored alongside
+    """
+    kdf = kdf or PASSWORD_KDF
+    if kdf == 'sha256':
+        return hashlib.sha256(pwd.encode()).hexdigest().lower()
+    salt = os.urandom(16)
+    if kdf == 'pbkdf2_sha256':
+        digest = hashlib.pbkdf2_hmac('sha256', pwd.encode(), salt,
+                                     PBKDF2_ITERATIONS)
+        return "pbkdf2_sha256${}${}${}".format(
+            PBKDF2_ITERATIONS, salt.hex(), digest.hex())
+    if kdf == 'scrypt':
+        n, r, p = SCRYPT_PARAMS
+        digest = hashlib.scrypt(pwd.encode(), salt=salt, n=n, r=r, p=p)
+        return "scrypt${}${}${}${}${}".format(
+            n, r, p, salt.hex(), digest.hex())
+    raise ValueError("Unknown password KDF {}".format(kdf))
+
+
+def _password_digests(pwd: str, stored: str):
+    """ (candidate digest, stored digest) as raw bytes
+    """
+    fields = stored.split('$')
+    if len(fields) == 1:
+        return hashlib.sha256(pwd.encode()).digest(), bytes.fromhex(stored)
+    if fields[0] == 'pbkdf2_sha256' and len(fields) == 4:
+        salt = bytes.fromhex(fields[2])
+        return (hashlib.pbkdf2_hmac('sha256', pwd.encode(), salt,
+                                    int(fields[1])),
+                bytes.fromhex(fields[3]))
+    if fields[0] == 'scrypt' and len(fields) == 6:
+        n, r, p = (int(f) for f in fields[1:4])
+        salt = bytes.fromhex(fields[4])
+        return (hashlib.scrypt(pwd.encode(), salt=salt, n=n, r=r, p=p),
+                bytes.fromhex(fields[5]))
+    raise ValueError("Unknown password format")
+
 
 class User(Base):
     """ User class
     """
 
+    __slots__ = ('email', '_password', 'first_name', 'last_name')
+    __indexes__ = ('email',)
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
@@ -26,22 +90,49 @@ class User(Base):
 
     @password.setter
     def password(self, pwd: str):
-        """ Setter of a new password: encrypt in SHA256
+        """ Setter of a new password: hashed with PASSWORD_KDF
         """
         if pwd is None or type(pwd) is not str:
             self._password = None
         else:
-            self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
+            self._password = hash_password(pwd)
 
     def is_valid_password(self, pwd: str) -> bool:
-        """ Validate a password
+        """ Validate a password, upgrading a legacy SHA256 hash to
+        PASSWORD_KDF once it matched
         """
         if pwd is None or type(pwd) is not str:
             return False
         if self.password is None:
             return False
-        pwd_e = pwd.encode()
-        return hashlib.sha256(pwd_e).hexdigest().lower() == self.password
+
+        cache_key = None
+        if VERIFY_CACHE_SIZE > 0:
+            cache_key = hmac.new(_verified_secret,
+                                 "{}\0{}".format(self.password,
+                                                 pwd).encode(),
+                                 hashlib.sha256).digest()
+            with _verified_lock:
+                if cache_key in _verified:
+                    _verified.move_to_end(cache_key)
+                    return True
+
+        try:
+            candidate, expected = _password_digests(pwd, self.password)
+        except ValueError:
+            return False
+        if not hmac.compare_digest(candidate, expected):
+            return False
+
+        if PASSWORD_KDF != 'sha256' and '$' not in self.password:
+            self.password = pwd
+            self.save()
+        elif cache_key is not None:
+            with _verified_lock:
+                _verified[cache_key] = None
+                while len(_verified) > VERIFY_CACHE_SIZE:
+                    _verified.popitem(last=False)
+        return True
 
     def display_name(self) -> str:
         """ Display User name based on email/first_name/last_name
@@ -7,6 +7,10 @@ from models.base import Base
 class UserSession(Base):
     """ User Session class
     """
+
+    __slots__ = ('user_id', 'session_id')
+    __indexes__ = ('session_id',)
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize UserSession instance
         """
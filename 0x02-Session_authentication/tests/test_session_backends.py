@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+""" Tests of the shared session backends
+Run from 0x02-Session_authentication: python3 -m unittest discover tests
+"""
+from datetime import datetime
+import os
+import socketserver
+import tempfile
+import threading
+import unittest
+import uuid
+from api.v1.auth.session_backends import (
+    MmapSessionBackend, RedisError, RedisSessionBackend)
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """ Answer GET, SET [EX], DEL and SELECT like a Redis server
+    """
+
+    def read_command(self) -> list:
+        """ Parse one RESP array of bulk strings, None on EOF
+        """
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        """ Serve the commands of one connection
+        """
+        server = self.server
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            server.commands.append(args)
+            name = args[0].upper()
+            if server.drop_next:
+                server.drop_next = False
+                return
+            if name == b'GET':
+                value = server.data.get(args[1])
+                reply = b'$-1\r\n' if value is None else \
+                    b'$%d\r\n%s\r\n' % (len(value), value)
+            elif name == b'SET':
+                server.data[args[1]] = args[2]
+                reply = b'+OK\r\n'
+            elif name == b'DEL':
+                reply = b':%d\r\n' % (server.data.pop(args[1], None)
+                                      is not None)
+            elif name == b'SELECT':
+                reply = b'+OK\r\n'
+            else:
+                reply = b'-ERR unknown command\r\n'
+            self.wfile.write(reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """ In-process stand-in for a Redis server
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        """ Listen on a free local port
+        """
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.data = {}
+        self.commands = []
+        self.drop_next = False
+
+
+class TestRedisSessionBackend(unittest.TestCase):
+    """ RedisSessionBackend against FakeRedisServer
+    """
+
+    def setUp(self):
+        """ Start the fake server and a client on db 2
+        """
+        self.server = FakeRedisServer()
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        host, port = self.server.server_address
+        self.backend = RedisSessionBackend.from_url(
+            'redis://{}:{}/2'.format(host, port))
+
+    def tearDown(self):
+        """ Stop the fake server
+        """
+        self.backend._close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_roundtrip(self):
+        """ Sessions are stored, read back and deleted
+        """
+        created_at = datetime(2024, 1, 2, 3, 4, 5)
+        self.backend['abc'] = {'user_id': 'u1', 'created_at': created_at}
+        self.backend['def'] = 'u2'
+        self.assertEqual(self.backend['abc'],
+                         {'user_id': 'u1', 'created_at': created_at})
+        self.assertEqual(self.backend.get('def'), 'u2')
+        self.assertIn(b'session:abc', self.server.data)
+        del self.backend['abc']
+        self.assertIsNone(self.backend.get('abc'))
+        with self.assertRaises(KeyError):
+            del self.backend['abc']
+        self.assertEqual(self.server.commands[0], [b'SELECT', b'2'])
+
+    def test_ttl(self):
+        """ The session duration is sent as the key TTL
+        """
+        self.backend.configure(60)
+        self.backend['abc'] = 'u1'
+        self.assertEqual(self.server.commands[-1][3:], [b'EX', b'60'])
+
+    def test_reconnect(self):
+        """ A dropped connection is reopened once
+        """
+        self.backend['abc'] = 'u1'
+        self.server.drop_next = True
+        self.assertEqual(self.backend.get('abc'), 'u1')
+
+    def test_error_reply(self):
+        """ Error replies raise RedisError
+        """
+        with self.assertRaises(RedisError):
+            self.backend.command('PING')
+
+
+class TestMmapSessionBackend(unittest.TestCase):
+    """ MmapSessionBackend on a temporary file
+    """
+
+    def setUp(self):
+        """ Create a small table
+        """
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.path)
+        self.backend = MmapSessionBackend(self.path, 256)
+
+    def tearDown(self):
+        """ Remove the table file
+        """
+        os.remove(self.path)
+
+    def empty_slots(self) -> int:
+        """ Number of EMPTY slots in the table
+        """
+        states = self.backend._map[::MmapSessionBackend.SLOT_SIZE]
+        return states.count(MmapSessionBackend.EMPTY)
+
+    def test_roundtrip(self):
+        """ Sessions are stored, read back and deleted
+        """
+        self.backend['abc'] = {'user_id': 'u1'}
+        self.assertEqual(self.backend['abc'], {'user_id': 'u1'})
+        del self.backend['abc']
+        self.assertIsNone(self.backend.get('abc'))
+        with self.assertRaises(KeyError):
+            del self.backend['abc']
+
+    def test_churn_leaves_no_tombstones(self):
+        """ Deleted slots are emptied, live sessions stay reachable
+        """
+        kept = {str(uuid.uuid4()): i for i in range(100)}
+        for session_id, value in kept.items():
+            self.backend[session_id] = value
+        for _ in range(5000):
+            session_id = str(uuid.uuid4())
+            self.backend[session_id] = 'u'
+            del self.backend[session_id]
+        self.assertEqual(self.empty_slots(), 256 - len(kept))
+        for session_id, value in kept.items():
+            self.assertEqual(self.backend.get(session_id), value)
+
+
+if __name__ == '__main__':
+    unittest.main()
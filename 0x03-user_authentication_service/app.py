@@ -10,6 +10,14 @@ app = Flask(__name__)
 AUTH = Auth()
 
 
+@app.teardown_appcontext
+def close_db_session(exception: BaseException = None) -> None:
+    """
+    Release the database session used by the request
+    """
+    AUTH.close_session()
+
+
 @app.route("/", methods=["GET"], strict_slashes=False)
 def index() -> str:
     """
@@ -72,12 +80,8 @@ def logout() -> str:
         Redirect to home page or 403 if user not found
     """
     session_id = request.cookies.get("session_id")
-    user = AUTH.get_user_from_session_id(session_id)
-    
-    if user is None:
+    if not AUTH.destroy_session_by_id(session_id):
         abort(403)
-    
-    AUTH.destroy_session(user.id)
     return redirect("/")
 
 
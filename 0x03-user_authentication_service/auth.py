@@ -3,13 +3,82 @@
 Authentication module for user management
 """
 import bcrypt
+import os
+import time
 import uuid
-from typing import Union
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from typing import Iterable, List, Tuple, Union
 from sqlalchemy.orm.exc import NoResultFound
 
 from db import DB
 from user import User
 
+MIN_ROUNDS = 12
+MAX_ROUNDS = 16
+_rounds = None
+_rehash_executor = ThreadPoolExecutor(max_workers=1)
+
+
+def _calibrate_rounds(budget_ms: float) -> int:
+    """
+    Benchmark bcrypt on this host and pick a cost for a latency budget
+
+    Each extra round doubles the work, so the time measured at
+    MIN_ROUNDS (best of two runs) is doubled until it would exceed
+    the budget.
+
+    Args:
+        budget_ms: Target duration of one hash in milliseconds
+
+    Returns:
+        Highest cost between MIN_ROUNDS and MAX_ROUNDS fitting the
+        budget; MIN_ROUNDS (the bcrypt default) is a floor the budget
+        never lowers
+    """
+    elapsed = None
+    for _ in range(2):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(MIN_ROUNDS))
+        sample = (time.perf_counter() - start) * 1000
+        elapsed = sample if elapsed is None else min(elapsed, sample)
+
+    rounds = MIN_ROUNDS
+    while rounds < MAX_ROUNDS and elapsed * 2 <= budget_ms:
+        elapsed *= 2
+        rounds += 1
+    return rounds
+
+
+def _bcrypt_rounds() -> int:
+    """
+    Get the bcrypt cost calibrated for this host
+
+    The budget comes from BCRYPT_LATENCY_BUDGET_MS (250 by default) and
+    the benchmark runs only once per process.
+
+    Returns:
+        bcrypt cost factor to use for new hashes
+    """
+    global _rounds
+    if _rounds is None:
+        budget = float(os.getenv("BCRYPT_LATENCY_BUDGET_MS", "250"))
+        _rounds = _calibrate_rounds(budget)
+    return _rounds
+
+
+def _hash_rounds(hashed_password: bytes) -> int:
+    """
+    Get the cost factor a bcrypt hash was computed with
+
+    Args:
+        hashed_password: bcrypt hash such as b"$2b$12$..."
+
+    Returns:
+        Cost factor stored in the hash
+    """
+    return int(hashed_password.split(b"$")[2])
+
 
 def _hash_password(password: str) -> bytes:
     """
@@ -21,10 +90,25 @@ def _hash_password(password: str) -> bytes:
     Returns:
         Salted hash of the input password
     """
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(_bcrypt_rounds())
     return bcrypt.hashpw(password.encode('utf-8'), salt)
 
 
+def _hash_password_rounds(password: str, rounds: int) -> str:
+    """
+    Hash a password with bcrypt at a given cost, in a worker process
+
+    Args:
+        password: Plain text password to hash
+        rounds: bcrypt cost factor
+
+    Returns:
+        Salted hash of the input password, decoded
+    """
+    salt = bcrypt.gensalt(rounds)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
 def _generate_uuid() -> str:
     """
     Generate a new UUID string
@@ -42,9 +126,10 @@ class Auth:
 
     def __init__(self):
         """
-        Initialize Auth instance
+        Initialize Auth instance and calibrate the bcrypt cost
         """
         self._db = DB()
+        _bcrypt_rounds()
 
     def register_user(self, email: str, password: str) -> User:
         """
@@ -67,6 +152,59 @@ class Auth:
             hashed_password = _hash_password(password)
             return self._db.add_user(email, hashed_password.decode('utf-8'))
 
+    def register_users(self, users: Iterable[Tuple[str, str]],
+                       max_workers: int = None) -> List[Tuple[str, str]]:
+        """
+        Register many users at once (e.g. to import an existing base)
+
+        Emails repeated in the input are kept once, the ones already
+        registered are found with batched IN lookups, and the passwords
+        of the new users are hashed in parallel on every core before a
+        chunked bulk insert.
+
+        Args:
+            users: (email, password) pairs
+            max_workers: Number of hashing processes (CPU count if None)
+
+        Returns:
+            (email, error message) of every user that was not registered;
+            a row that is not an (email, password) pair is reported as is
+        """
+        failures = []
+        new_users = {}
+        for row in users:
+            try:
+                if isinstance(row, (str, bytes)):
+                    raise ValueError(row)
+                email, password = row
+            except (TypeError, ValueError):
+                failures.append((row, "expected an (email, password) pair"))
+                continue
+            if not isinstance(email, str) or not isinstance(password, str) \
+                    or not email or not password:
+                failures.append((email, "invalid email or password"))
+            elif email in new_users:
+                failures.append((email, "duplicate email in input"))
+            else:
+                new_users[email] = password
+
+        for email in self._db.find_emails(new_users):
+            del new_users[email]
+            failures.append((email, f"User {email} already exists"))
+        if not new_users:
+            return failures
+
+        rounds = _bcrypt_rounds()
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(new_users) // (8 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            hashed_passwords = executor.map(
+                _hash_password_rounds, new_users.values(), repeat(rounds),
+                chunksize=chunksize)
+            rows = list(zip(new_users, hashed_passwords))
+        failures.extend(self._db.add_users_bulk(rows))
+        return failures
+
     def valid_login(self, email: str, password: str) -> bool:
         """
         Validate user login credentials
@@ -80,10 +218,47 @@ class Auth:
         """
         try:
             user = self._db.find_user_by(email=email)
-            return bcrypt.checkpw(password.encode('utf-8'), 
-                                user.hashed_password.encode('utf-8'))
         except NoResultFound:
             return False
+        hashed_password = user.hashed_password.encode('utf-8')
+        if not bcrypt.checkpw(password.encode('utf-8'), hashed_password):
+            return False
+        if _hash_rounds(hashed_password) < _bcrypt_rounds():
+            _rehash_executor.submit(self._rehash_password, user.id,
+                                    password, user.hashed_password)
+        return True
+
+    def _rehash_password(self, user_id: int, password: str,
+                         old_hash: str) -> bool:
+        """
+        Store a new hash of password at the calibrated cost
+
+        Runs in the background after a successful login with a hash
+        computed at an outdated cost. The hash is only replaced if it is
+        still the one that was verified, so a password changed in the
+        meantime is never overwritten.
+
+        Args:
+            user_id: ID of the user to update
+            password: Plain text password that was just verified
+            old_hash: Stored hash the password was verified against
+
+        Returns:
+            True if the new hash was stored, False if it was skipped
+        """
+        hashed_password = _hash_password(password)
+        try:
+            return self._db.update_users_where(
+                {"id": user_id, "hashed_password": old_hash},
+                hashed_password=hashed_password.decode('utf-8')) > 0
+        finally:
+            self._db.remove_session()
+
+    def close_session(self) -> None:
+        """
+        Release the database session of the current thread
+        """
+        self._db.remove_session()
 
     def create_session(self, email: str) -> Union[str, None]:
         """
@@ -95,13 +270,11 @@ class Auth:
         Returns:
             Session ID string if user exists, None otherwise
         """
-        try:
-            user = self._db.find_user_by(email=email)
-            session_id = _generate_uuid()
-            self._db.update_user(user.id, session_id=session_id)
-            return session_id
-        except NoResultFound:
+        session_id = _generate_uuid()
+        if self._db.update_users_where({"email": email},
+                                       session_id=session_id) == 0:
             return None
+        return session_id
 
     def get_user_from_session_id(self, session_id: str) -> Union[User, None]:
         """
@@ -130,6 +303,21 @@ class Auth:
         """
         self._db.update_user(user_id, session_id=None)
 
+    def destroy_session_by_id(self, session_id: str) -> bool:
+        """
+        Destroy a session from its ID with a single UPDATE
+
+        Args:
+            session_id: Session ID string
+
+        Returns:
+            True if a user had this session, False otherwise
+        """
+        if session_id is None:
+            return False
+        return self._db.update_users_where({"session_id": session_id},
+                                           session_id=None) > 0
+
     def get_reset_password_token(self, email: str) -> str:
         """
         Generate a reset password token
@@ -143,13 +331,11 @@ class Auth:
         Raises:
             ValueError: If user does not exist
         """
-        try:
-            user = self._db.find_user_by(email=email)
-            reset_token = _generate_uuid()
-            self._db.update_user(user.id, reset_token=reset_token)
-            return reset_token
-        except NoResultFound:
+        reset_token = _generate_uuid()
+        if self._db.update_users_where({"email": email},
+                                       reset_token=reset_token) == 0:
             raise ValueError("User not found")
+        return reset_token
 
     def update_password(self, reset_token: str, password: str) -> None:
         """
@@ -2,16 +2,78 @@
 """
 DB module for managing database operations
 """
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm.session import Session
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
-from typing import Dict, Any
+from sqlalchemy.exc import InvalidRequestError, SQLAlchemyError
+from typing import Dict, Any, Iterable, List, Set, Tuple
 
 from user import Base, User
 
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": os.getenv("AUTH_DB_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("AUTH_DB_CACHE_SIZE", str(-64 * 1024)),
+}
+USER_COLUMNS = frozenset(attr.key for attr in inspect(User).column_attrs)
+SQLITE_POOL_DEFAULTS = {"pool_size": 5, "max_overflow": 10}
+POOL_SETTINGS = {
+    "AUTH_DB_POOL_SIZE": "pool_size",
+    "AUTH_DB_MAX_OVERFLOW": "max_overflow",
+    "AUTH_DB_POOL_TIMEOUT": "pool_timeout",
+    "AUTH_DB_POOL_RECYCLE": "pool_recycle",
+}
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    """
+    Read the connection pool settings from the environment
+
+    SQLite database files get a QueuePool sized by SQLITE_POOL_DEFAULTS
+    (SQLAlchemy would open a new connection, and rerun the pragmas, for
+    every session otherwise); in-memory SQLite keeps its own pool.
+    Other databases keep the default pool of their dialect. Variables
+    of POOL_SETTINGS that are set override the sizes in both cases.
+    SQLite connections may be used from any thread, as pooled
+    connections change threads.
+
+    Args:
+        url: Database URL the engine is created for
+
+    Returns:
+        Keyword arguments for create_engine
+    """
+    options = {}
+    parsed = make_url(url)
+    sqlite = parsed.get_backend_name() == "sqlite"
+    if sqlite and parsed.database not in (None, "", ":memory:"):
+        options.update(SQLITE_POOL_DEFAULTS, poolclass=QueuePool)
+    for name, option in POOL_SETTINGS.items():
+        value = os.getenv(name)
+        if value is not None:
+            options[option] = int(value)
+    if options.keys() & {"pool_size", "max_overflow", "pool_timeout"}:
+        options["poolclass"] = QueuePool
+    if sqlite:
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Apply SQLITE_PRAGMAS on every new SQLite connection
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
 
 class DB:
     """
@@ -21,21 +83,58 @@ class DB:
     def __init__(self) -> None:
         """
         Initialize a new DB instance
+
+        The database is AUTH_DB_URL (sqlite:///a.db by default). It is
+        wiped at every start unless AUTH_DB_PERSIST is set to 1, in which
+        case the existing data is kept and only the missing tables and
+        indexes are created. SQLite connections get SQLITE_PRAGMAS.
+
+        Each thread gets its own session from a scoped_session registry;
+        objects stay readable after commit and after remove_session().
+        """
+        url = os.getenv("AUTH_DB_URL", "sqlite:///a.db")
+        self._engine = create_engine(url, echo=False, **_engine_options(url))
+        if self._engine.dialect.name == "sqlite":
+            event.listen(self._engine, "connect", _set_sqlite_pragmas)
+        if os.getenv("AUTH_DB_PERSIST", "0") != "1":
+            Base.metadata.drop_all(self._engine)
+        self.migrate()
+        self._sessions = scoped_session(
+            sessionmaker(bind=self._engine, expire_on_commit=False))
+
+    def migrate(self) -> None:
+        """
+        Bring the database up to the schema declared by the models
+
+        Missing tables are created, then the indexes declared on the
+        models but absent from existing tables (e.g. a database created
+        before they were added) are built in place. No data is dropped.
+
+        Raises:
+            IntegrityError: If duplicate emails prevent the unique index
         """
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
         Base.metadata.create_all(self._engine)
-        self.__session = None
+        inspector = inspect(self._engine)
+        for table in Base.metadata.sorted_tables:
+            existing = {index["name"]
+                        for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(self._engine)
 
     @property
     def _session(self) -> Session:
         """
-        Memoized session object
+        Session of the current thread, created on first use
+        """
+        return self._sessions()
+
+    def remove_session(self) -> None:
+        """
+        Close the session of the current thread and return its
+        connection to the pool (end of a request or background task)
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        self._sessions.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -53,6 +152,65 @@ class DB:
         self._session.commit()
         return new_user
 
+    def add_users_bulk(self, users: Iterable[Tuple[str, str]],
+                       chunk_size: int = 1000) -> List[Tuple[str, str]]:
+        """
+        Insert many users with one executemany INSERT per chunk, each
+        chunk in its own transaction
+
+        A chunk that fails (e.g. an email already taken) is rolled back
+        and inserted again row by row, so only the faulty rows are lost.
+
+        Args:
+            users: (email, hashed_password) pairs
+            chunk_size: Number of users inserted per transaction
+
+        Returns:
+            (email, error message) of every user that was not inserted
+        """
+        failures = []
+        insert = User.__table__.insert()
+        rows = [{"email": email, "hashed_password": hashed_password}
+                for email, hashed_password in users]
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            try:
+                self._session.execute(insert, chunk)
+                self._session.commit()
+                continue
+            except SQLAlchemyError:
+                self._session.rollback()
+            for row in chunk:
+                try:
+                    self._session.execute(insert, [row])
+                    self._session.commit()
+                except SQLAlchemyError as e:
+                    self._session.rollback()
+                    error = getattr(e, 'orig', None) or e
+                    failures.append((row["email"], str(error)))
+        return failures
+
+    def find_emails(self, emails: Iterable[str],
+                    chunk_size: int = 500) -> Set[str]:
+        """
+        Find which emails are already registered, with one
+        SELECT ... WHERE email IN (...) per chunk
+
+        Args:
+            emails: Emails to look up
+            chunk_size: Number of emails per query
+
+        Returns:
+            Set of the emails found
+        """
+        emails = list(emails)
+        found = set()
+        for i in range(0, len(emails), chunk_size):
+            query = self._session.query(User.email).filter(
+                User.email.in_(emails[i:i + chunk_size]))
+            found.update(email for email, in query)
+        return found
+
     def find_user_by(self, **kwargs) -> User:
         """
         Find a user by arbitrary keyword arguments
@@ -77,21 +235,47 @@ class DB:
 
     def update_user(self, user_id: int, **kwargs) -> None:
         """
-        Update a user's attributes
-        
+        Update a user's attributes with a single UPDATE statement
+
         Args:
             user_id: ID of the user to update
-            **kwargs: Arbitrary keyword arguments representing attributes to update
-            
+            **kwargs: Column names and their new values
+
         Raises:
             ValueError: If an invalid attribute is passed
+            NoResultFound: If no user has this ID
         """
-        user = self.find_user_by(id=user_id)
-        
-        for key, value in kwargs.items():
-            if hasattr(user, key):
-                setattr(user, key, value)
-            else:
+        if self.update_users_where({"id": user_id}, **kwargs) == 0:
+            raise NoResultFound
+
+    def update_users_where(self, where: Dict[str, Any], **kwargs) -> int:
+        """
+        Update the users matching equality criteria in one
+        UPDATE ... WHERE statement, without loading them first
+
+        Column names are checked against USER_COLUMNS, read once from
+        the mapper. Users already loaded in the session are updated too.
+
+        Args:
+            where: Column names and the values to match
+            **kwargs: Column names and their new values
+
+        Returns:
+            Number of users updated
+
+        Raises:
+            InvalidRequestError: If an invalid criteria column is passed
+            ValueError: If an invalid attribute is passed
+        """
+        if not where or not where.keys() <= USER_COLUMNS:
+            raise InvalidRequestError
+        for key in kwargs:
+            if key not in USER_COLUMNS:
                 raise ValueError(f"User has no attribute {key}")
-        
+        if not kwargs:
+            return self._session.query(User).filter_by(**where).count()
+
+        count = self._session.query(User).filter_by(**where).update(
+            kwargs, synchronize_session="evaluate")
         self._session.commit()
+        return count
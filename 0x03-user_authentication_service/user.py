@@ -14,15 +14,15 @@ class User(Base):
     
     Attributes:
         id: Primary key integer
-        email: Non-nullable string for user email
+        email: Non-nullable string for user email (unique index)
         hashed_password: Non-nullable string for hashed password
-        session_id: Nullable string for session identification
-        reset_token: Nullable string for password reset token
+        session_id: Nullable string for session identification (indexed)
+        reset_token: Nullable string for password reset token (indexed)
     """
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True)
-    email = Column(String(250), nullable=False)
+    email = Column(String(250), nullable=False, unique=True, index=True)
     hashed_password = Column(String(250), nullable=False)
-    session_id = Column(String(250), nullable=True)
-    reset_token = Column(String(250), nullable=True)
+    session_id = Column(String(250), nullable=True, index=True)
+    reset_token = Column(String(250), nullable=True, index=True)